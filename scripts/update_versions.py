@@ -4,15 +4,32 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import datetime as dt
+import hashlib
+import http.client
 import json
+import os
+import re
 import shutil
 import subprocess
 import sys
+import tempfile
 import textwrap
-import urllib.error
-import urllib.request
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+try:  # Optional faster decoder; its JSONDecodeError subclasses json's
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 LANGUAGE_SOURCES = {
     "Go": {
@@ -55,17 +72,296 @@ except AttributeError:  # Fallback for older interpreters
 
 GH_PATH = shutil.which("gh")
 
-if GH_PATH is None:
-    raise SystemExit("gh CLI is required to run this script")
-
 USER_AGENT = "llm-shared-version-bot/1.0"
 
+DEFAULT_HEADERS = {"User-Agent": USER_AGENT}
+MAX_REDIRECTS = 3
+CROSS_HOST_STRIPPED_HEADERS = frozenset(
+    {"authorization", "if-none-match", "if-modified-since"}
+)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+MAX_RETRY_AFTER = 60
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+MAX_WORKERS = 16
+
+GITHUB_API = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API}/graphql"
+
 END_OF_LIFE_URL = "https://endoflife.date/api/v1/products/{id}/releases/latest"
 
+# Per-user location so other accounts on a shared host can't plant responses.
+CACHE_PATH = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "llm-shared"
+    / "versions.json"
+)
+CACHE_TTL = 24 * 60 * 60
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M UTC"
+LAST_UPDATED_RE = re.compile(r"_Last updated: (.+)_$")
+
+
+@dataclass
+class FetchSettings:
+    use_cache: bool = True
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+
+
+SETTINGS = FetchSettings()
+
+_cache_lock = threading.Lock()
+_cache: dict[str, dict] | None = None
+
+
+def _load_cache() -> dict[str, dict]:
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        try:
+            loaded = _loads(CACHE_PATH.read_bytes())
+        except (OSError, json.JSONDecodeError):
+            loaded = {}
+        _cache = loaded if isinstance(loaded, dict) else {}
+    return _cache
+
+
+def _cache_entry(key: str) -> dict | None:
+    with _cache_lock:
+        entry = _load_cache().get(key)
+    return entry if isinstance(entry, dict) else None
+
+
+def _cache_get(key: str) -> dict | None:
+    if not SETTINGS.use_cache:
+        return None
+    entry = _cache_entry(key)
+    if entry is None or time.time() - entry.get("ts", 0) >= CACHE_TTL:
+        return None
+    return entry.get("data")
+
+
+def _cache_put(
+    key: str,
+    value: dict,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> None:
+    with _cache_lock:
+        cache = _load_cache()
+        cache[key] = {
+            "ts": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "data": value,
+        }
+        tmp_name = None
+        try:
+            CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            # A unique temp file per write keeps concurrent runs from clobbering
+            # each other before the atomic replace.
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=CACHE_PATH.parent, delete=False
+            ) as handle:
+                tmp_name = handle.name
+                handle.write(json.dumps(cache))
+            os.replace(tmp_name, CACHE_PATH)
+        except OSError as exc:
+            print(f"Warning: could not write cache: {exc}", file=sys.stderr)
+            if tmp_name:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_name)
+
+
+def _conditional_headers(entry: dict | None) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    if entry is None:
+        return headers
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+# A fetcher takes the conditional request headers and returns the decoded body
+# (None when the server answered 304 Not Modified) plus the response's ETag and
+# Last-Modified values.
+Fetcher = Callable[[dict[str, str]], tuple[dict | None, str | None, str | None]]
+
+
+def _cached_fetch(url: str, fetch: Fetcher) -> dict:
+    cached = _cache_get(url)
+    if cached is not None:
+        return cached
+
+    # Stale entries are revalidated rather than refetched; 304 responses have
+    # no body and do not count against GitHub's primary rate limit. With the
+    # cache disabled nothing stored is trusted, not even for revalidation.
+    entry = _cache_entry(url) if SETTINGS.use_cache else None
+    data, etag, last_modified = fetch(_conditional_headers(entry))
+    if data is None:
+        if entry is None:
+            raise RuntimeError(f"GET {url} returned 304 without a cached copy")
+        data = entry["data"]
+        etag = etag or entry.get("etag")
+        last_modified = last_modified or entry.get("last_modified")
+    _cache_put(url, data, etag=etag, last_modified=last_modified)
+    return data
+
+
+class HTTPStatusError(RuntimeError):
+    def __init__(self, url: str, status: int) -> None:
+        super().__init__(f"{url} returned HTTP {status}")
+        self.status = status
+
+
+def _github_token() -> str | None:
+    return os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+
+
+def _github_headers() -> dict[str, str]:
+    headers = {"Accept": "application/vnd.github+json"}
+    token = _github_token()
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+# http.client connections are not thread-safe, so each worker thread keeps its
+# own pool of keep-alive connections, one per host.
+_local = threading.local()
+
+
+def _connection(host: str) -> http.client.HTTPSConnection:
+    pool = getattr(_local, "connections", None)
+    if pool is None:
+        pool = _local.connections = {}
+    conn = pool.get(host)
+    if conn is None:
+        conn = http.client.HTTPSConnection(host, timeout=SETTINGS.connect_timeout)
+        pool[host] = conn
+    return conn
+
+
+def _http_request(
+    method: str, url: str, headers: dict[str, str], body: bytes | None = None
+) -> tuple[http.client.HTTPResponse, bytes]:
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        conn = _connection(parts.netloc)
+        try:
+            if conn.sock is None:
+                # Fail fast on unreachable hosts, but give slow responses more time.
+                conn.connect()
+                conn.sock.settimeout(SETTINGS.read_timeout)
+            conn.request(method, path, body, headers={**DEFAULT_HEADERS, **headers})
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+
+        location = response.getheader("Location")
+        redirected = response.status in (301, 302, 307, 308) and location
+        if method != "GET" or not redirected:
+            return response, data
+        url = urllib.parse.urljoin(url, location)
+        target = urllib.parse.urlsplit(url)
+        if target.scheme != "https":
+            raise RuntimeError(f"{method} {url}: refusing non-HTTPS redirect")
+        if target.netloc != parts.netloc:
+            # Like requests/urllib3: credentials and validators for one host
+            # are never forwarded to another.
+            headers = {
+                name: value
+                for name, value in headers.items()
+                if name.lower() not in CROSS_HOST_STRIPPED_HEADERS
+            }
+    raise RuntimeError(f"{method} {url} redirected too many times")
+
+
+def _retry_delay(response: http.client.HTTPResponse, attempt: int) -> float | None:
+    rate_limited = response.status == 403 and (
+        response.getheader("Retry-After")
+        or response.getheader("X-RateLimit-Remaining") == "0"
+    )
+    if response.status not in RETRY_STATUSES and not rate_limited:
+        return None
+    retry_after = response.getheader("Retry-After")
+    if retry_after and retry_after.isdigit():
+        delay = float(retry_after)
+        return delay if delay <= MAX_RETRY_AFTER else None
+    if rate_limited:
+        # GitHub only reports when the hourly quota resets; don't wait for it.
+        return None
+    return RETRY_BACKOFF * 2**attempt
+
+
+def _retry_fetch(
+    method: str, url: str, headers: dict[str, str], body: bytes | None = None
+) -> tuple[http.client.HTTPResponse, bytes]:
+    attempt = 0
+    while True:
+        try:
+            response, data = _http_request(method, url, headers, body)
+        except (OSError, http.client.HTTPException) as exc:
+            if attempt == MAX_RETRIES:
+                raise RuntimeError(f"{method} {url} failed: {exc}") from exc
+            delay = RETRY_BACKOFF * 2**attempt
+        else:
+            delay = _retry_delay(response, attempt)
+            if delay is None or attempt == MAX_RETRIES:
+                return response, data
+        time.sleep(delay)
+        attempt += 1
+
+
+def _request_json(
+    url: str,
+    headers: dict[str, str],
+    method: str = "GET",
+    body: bytes | None = None,
+) -> tuple[dict | None, str | None, str | None]:
+    response, data = _retry_fetch(method, url, headers, body)
+    if response.status == 304:
+        return None, None, None
+    if response.status != 200:
+        raise HTTPStatusError(url, response.status)
+
+    try:
+        decoded = _loads(data)
+    except json.JSONDecodeError as exc:
+        raise RuntimeError(f"{method} {url} returned non-JSON output") from exc
+    return decoded, response.getheader("ETag"), response.getheader("Last-Modified")
+
+
+def _fetch_json(url: str, headers: dict[str, str] | None = None) -> dict:
+    extra = headers or {}
+    return _cached_fetch(
+        url, lambda conditional: _request_json(url, {**extra, **conditional})
+    )
+
 
 def _gh_api(path: str) -> dict:
-    if not GH_PATH:
-        raise SystemExit("gh CLI is required to run this script")
+    url = f"{GITHUB_API}/{path}"
+
+    def fetch(
+        conditional: dict[str, str],
+    ) -> tuple[dict | None, str | None, str | None]:
+        try:
+            return _request_json(url, {**_github_headers(), **conditional})
+        except HTTPStatusError as exc:
+            if exc.status not in (401, 403) or not GH_PATH:
+                raise
+        # Missing or rate-limited token: let gh use its own credentials.
+        return _gh_cli_api(path), None, None
+
+    return _cached_fetch(url, fetch)
+
+
+def _gh_cli_api(path: str) -> dict:
     try:
         result = subprocess.run(
             [GH_PATH, "api", path],
@@ -77,22 +373,14 @@ def _gh_api(path: str) -> dict:
         raise RuntimeError(f"gh api {path} failed: {exc}") from exc
 
     try:
-        return json.loads(result.stdout)
+        return _loads(result.stdout)
     except json.JSONDecodeError as exc:
         raise RuntimeError(f"gh api {path} returned non-JSON output") from exc
 
 
-def _fetch_json(url: str, headers: dict[str, str] | None = None) -> dict:
-    if headers is None:
-        headers = {"User-Agent": USER_AGENT}
-    request = urllib.request.Request(url, headers=headers)
-    with urllib.request.urlopen(request, timeout=30) as response:
-        return json.load(response)
-
-
 def _latest_endoflife_version(product: str) -> str:
     url = END_OF_LIFE_URL.format(id=product)
-    data = _fetch_json(url, headers={"User-Agent": USER_AGENT})
+    data = _fetch_json(url)
     if not isinstance(data, dict):
         return "unknown"
 
@@ -114,6 +402,49 @@ def _latest_endoflife_version(product: str) -> str:
     return "unknown"
 
 
+def _graphql(query: str) -> dict:
+    body = json.dumps({"query": query}).encode("utf-8")
+    key = f"{GITHUB_GRAPHQL_URL}#{hashlib.sha256(body).hexdigest()[:16]}"
+    headers = {**_github_headers(), "Content-Type": "application/json"}
+    return _cached_fetch(
+        key,
+        lambda _conditional: _request_json(
+            GITHUB_GRAPHQL_URL, headers, method="POST", body=body
+        ),
+    )
+
+
+def _latest_action_tags_batch(repos: list[str]) -> dict[str, str]:
+    # One aliased GraphQL query covers every repo for a single rate-limit point.
+    # Repos missing from the result (no release, lookup error, or no token to
+    # authenticate with) are left for the caller to retry over REST.
+    if not repos or not _github_token():
+        return {}
+
+    fields = []
+    for index, repo in enumerate(repos):
+        owner, name = (json.dumps(part) for part in repo.split("/", 1))
+        fields.append(
+            f"a{index}: repository(owner: {owner}, name: {name})"
+            " { latestRelease { tagName } }"
+        )
+    query = "query {\n  " + "\n  ".join(fields) + "\n}"
+
+    try:
+        data = _graphql(query).get("data") or {}
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"Warning: GraphQL release lookup failed: {exc}", file=sys.stderr)
+        return {}
+
+    tags: dict[str, str] = {}
+    for index, repo in enumerate(repos):
+        release = (data.get(f"a{index}") or {}).get("latestRelease") or {}
+        tag = release.get("tagName")
+        if tag:
+            tags[repo] = tag
+    return tags
+
+
 def _latest_action_tag(repo: str) -> str:
     data = _gh_api(f"repos/{repo}/releases/latest")
     tag = data.get("tag_name") or data.get("name")
@@ -136,36 +467,52 @@ class ActionRecord:
     url: str
 
 
-def collect_language_versions() -> list[VersionRecord]:
-    records: list[VersionRecord] = []
-    for name, meta in LANGUAGE_SOURCES.items():
-        try:
-            version = _latest_endoflife_version(meta["id"])
-        except Exception as exc:  # pylint: disable=broad-except
-            print(f"Warning: could not fetch {name} version: {exc}", file=sys.stderr)
-            version = "unknown"
-        records.append(VersionRecord(name=name, version=version, source=meta["notes"]))
-    return records
+def _version_or_unknown(future: Future[str], label: str) -> str:
+    try:
+        return future.result()
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"Warning: could not fetch {label}: {exc}", file=sys.stderr)
+        return "unknown"
 
 
-def collect_action_versions() -> list[ActionRecord]:
-    records: list[ActionRecord] = []
-    for repo in GITHUB_ACTIONS:
-        try:
-            version = _latest_action_tag(repo)
-        except Exception as exc:  # pylint: disable=broad-except
-            print(
-                f"Warning: could not fetch {repo} action version: {exc}",
-                file=sys.stderr,
+def collect_versions() -> tuple[list[VersionRecord], list[ActionRecord]]:
+    # Every lookup is network-bound, so they all share one thread pool: the
+    # language lookups overlap the GraphQL batch and any per-repo fallbacks.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        language_futures = {
+            name: executor.submit(_latest_endoflife_version, meta["id"])
+            for name, meta in LANGUAGE_SOURCES.items()
+        }
+        tags = _latest_action_tags_batch(GITHUB_ACTIONS)
+        action_futures = {
+            repo: executor.submit(_latest_action_tag, repo)
+            for repo in GITHUB_ACTIONS
+            if repo not in tags
+        }
+
+        languages = [
+            VersionRecord(
+                name=name,
+                version=_version_or_unknown(future, f"{name} version"),
+                source=LANGUAGE_SOURCES[name]["notes"],
             )
-            version = "unknown"
-        url = f"{GITHUB_BASE}/{repo}"
-        records.append(ActionRecord(repo=repo, version=version, url=url))
-    return records
+            for name, future in language_futures.items()
+        ]
+
+        actions: list[ActionRecord] = []
+        for repo in GITHUB_ACTIONS:
+            if repo in tags:
+                version = tags[repo]
+            else:
+                label = f"{repo} action version"
+                version = _version_or_unknown(action_futures[repo], label)
+            url = f"{GITHUB_BASE}/{repo}"
+            actions.append(ActionRecord(repo=repo, version=version, url=url))
+    return languages, actions
 
 
 def render_markdown(languages: list[VersionRecord], actions: list[ActionRecord]) -> str:
-    timestamp = dt.datetime.now(UTC).strftime("%Y-%m-%d %H:%M UTC")
+    timestamp = dt.datetime.now(UTC).strftime(TIMESTAMP_FORMAT)
     lines = [
         "# Toolchain Versions",
         "",
@@ -189,7 +536,7 @@ def render_markdown(languages: list[VersionRecord], actions: list[ActionRecord])
     lines.append(
         textwrap.dedent(
             """\
-        > Run `python scripts/update_versions.py` locally to refresh this table immediately.
+        > Run `python scripts/update_versions.py --force` locally to refresh this table immediately.
         """
         ).strip()
     )
@@ -197,9 +544,35 @@ def render_markdown(languages: list[VersionRecord], actions: list[ActionRecord])
     return "\n".join(lines)
 
 
-def write_versions_file(path: str) -> None:
-    languages = collect_language_versions()
-    actions = collect_action_versions()
+def _last_updated(path: str) -> dt.datetime | None:
+    # The file's mtime is reset by clone/checkout/pull, so the age comes from
+    # the stamp render_markdown writes instead.
+    try:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                match = LAST_UPDATED_RE.match(line.strip())
+                if match:
+                    return dt.datetime.strptime(
+                        match.group(1), TIMESTAMP_FORMAT
+                    ).replace(tzinfo=UTC)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def write_versions_file(path: str, force: bool = False) -> None:
+    # Same 24 h freshness window as the response cache, applied to the output
+    # itself so a recent file skips all network work.
+    updated = None if force else _last_updated(path)
+    if updated is not None:
+        age = (dt.datetime.now(UTC) - updated).total_seconds()
+        if 0 <= age < CACHE_TTL:
+            print(
+                f"{path} was updated {age / 3600:.1f} h ago; use --force to refresh",
+                file=sys.stderr,
+            )
+            return
+    languages, actions = collect_versions()
     markdown = render_markdown(languages, actions)
     with open(path, "w", encoding="utf-8") as handle:
         handle.write(markdown + "\n")
@@ -211,7 +584,7 @@ def _link(label: str, url: str | None) -> str:
     return f"[{label}]({url})"
 
 
-def parse_args(argv: list[str]) -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Update versions.md with current tool versions"
     )
@@ -220,13 +593,41 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         default="versions.md",
         help="Path to versions.md (default: versions.md)",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=(
+            "Refresh the output even if it was updated in the last 24 hours,"
+            " refetching every API response"
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Ignore cached API responses in {CACHE_PATH}",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=FetchSettings.connect_timeout,
+        help="Seconds to wait for a connection (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=FetchSettings.read_timeout,
+        help="Seconds to wait for a response once connected (default: %(default)s)",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> int:
-    args = parse_args(argv or sys.argv[1:])
+    args = parse_args(argv)
+    SETTINGS.use_cache = not (args.no_cache or args.force)
+    SETTINGS.connect_timeout = args.connect_timeout
+    SETTINGS.read_timeout = args.read_timeout
     try:
-        write_versions_file(args.output)
+        write_versions_file(args.output, force=args.force)
     except Exception as exc:  # pylint: disable=broad-except
         print(f"Error: {exc}", file=sys.stderr)
         return 1
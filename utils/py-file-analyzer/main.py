@@ -8,9 +8,36 @@ import argparse
 import ast
 import os
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Minimum number of files before analysis is spread across processes
+PARALLEL_THRESHOLD = 64
+
+# Files larger than this are line-counted but not parsed
+MAX_BYTES = 512 * 1024
+
+# A null byte within this many leading bytes marks a file as binary
+BINARY_SNIFF_BYTES = 4096
+
+# Common non-source directories that are never scanned
+SKIP_DIRS = frozenset({'.git', '__pycache__', '.pytest_cache', '.tox', 'venv', 'env', '.venv',
+                       'node_modules', 'build', 'dist', 'target', 'vendor'})
+
+# Filename patterns for generated code (protobuf) and test files
+GENERATED_SUFFIXES = ('_pb2.py',)
+TEST_PREFIXES = ('test_',)
+TEST_SUFFIXES = ('_test.py',)
+
+# Top-level modules that mark a file as handling web or database concerns
+WEB_MODULES = frozenset({'flask', 'django', 'fastapi', 'tornado', 'aiohttp', 'requests', 'httpx'})
+DB_MODULES = frozenset({'sqlalchemy', 'psycopg2', 'pymongo', 'sqlite3', 'redis', 'asyncpg'})
+
+
+def _empty_buckets() -> Dict[str, int]:
+    return {'over100': 0, 'between50_100': 0, 'between20_49': 0, 'under20': 0}
 
 
 @dataclass
@@ -33,6 +60,19 @@ class FileAnalysis:
     method_counts: Dict[str, int]
     top_level_functions: int
     notes: List[str]
+    buckets: Dict[str, int] = field(default_factory=_empty_buckets)
+
+
+@dataclass
+class FunctionStats:
+    buckets: Dict[str, int] = field(default_factory=_empty_buckets)
+    method_counts: Dict[str, int] = field(default_factory=dict)
+    top_level_functions: int = 0
+    long_count: int = 0
+    very_long_count: int = 0
+    high_stmt_count: int = 0
+    has_async: bool = False
+    has_sync: bool = False
 
 
 class ComplexityAnalyzer(ast.NodeVisitor):
@@ -71,9 +111,10 @@ class ComplexityAnalyzer(ast.NodeVisitor):
         self._process_function(node, is_async=True)
     
     def _process_function(self, node, is_async: bool):
-        # Determine function boundaries
+        # Determine function boundaries from the parser's position info,
+        # so no extra traversal of the body is needed
         start_line = node.lineno
-        end_line = self._find_function_end(node)
+        end_line = node.end_lineno or start_line
         lines = end_line - start_line + 1
         
         # Count statements (approximate by AST node count in body)
@@ -94,100 +135,123 @@ class ComplexityAnalyzer(ast.NodeVisitor):
         
         self.functions.append(func_info)
         self.generic_visit(node)
+
+
+def _summarize_functions(functions: List[FunctionInfo]) -> FunctionStats:
+    """Tally length buckets, method counts and complexity counters in one pass."""
+    stats = FunctionStats()
+    buckets = stats.buckets
+    method_counts = stats.method_counts
     
-    def _find_function_end(self, node) -> int:
-        """Find the end line of a function by looking at the last node."""
-        def find_last_node(n):
-            if hasattr(n, 'lineno'):
-                last = n.lineno
-            else:
-                last = 0
-            
-            if hasattr(n, 'end_lineno') and n.end_lineno:
-                return max(last, n.end_lineno)
-            
-            # For child nodes, find the one with the highest line number
-            for child in ast.walk(n):
-                if hasattr(child, 'lineno'):
-                    last = max(last, child.lineno)
-                if hasattr(child, 'end_lineno') and child.end_lineno:
-                    last = max(last, child.end_lineno)
-            return last
+    for func in functions:
+        if func.lines > 100:
+            buckets['over100'] += 1
+        elif func.lines >= 50:
+            buckets['between50_100'] += 1
+        elif func.lines >= 20:
+            buckets['between20_49'] += 1
+        else:
+            buckets['under20'] += 1
+        
+        if func.lines > 50:
+            stats.long_count += 1
+            if func.lines > 100:
+                stats.very_long_count += 1
+        if func.statements > 20:
+            stats.high_stmt_count += 1
+        
+        if func.is_async:
+            stats.has_async = True
+        else:
+            stats.has_sync = True
         
-        end = find_last_node(node)
-        # Handle case where function has no content
-        if end < node.lineno:
-            end = node.lineno
-        return end
+        if func.is_method and func.class_name:
+            method_counts[func.class_name] = method_counts.get(func.class_name, 0) + 1
+        elif not func.is_method:
+            stats.top_level_functions += 1
+    
+    return stats
 
 
-def count_file_lines(file_path: str) -> int:
-    """Count total lines in a Python file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return len(f.readlines())
-    except (UnicodeDecodeError, IOError):
-        return 0
+def _unparsed_analysis(file_path: str, lines: int, note: str) -> FileAnalysis:
+    """Build the result for a file whose AST could not or should not be analyzed."""
+    return FileAnalysis(
+        path=file_path,
+        lines=lines,
+        classes=[],
+        functions=[],
+        imports=[],
+        method_counts={},
+        top_level_functions=0,
+        notes=[note]
+    )
+
 
+def _count_lines(data: bytes) -> int:
+    """Count lines as text-mode readlines() would, without decoding.
+    
+    \r\n, \r and \n each end a line, and a trailing partial line counts too.
+    """
+    endings = data.count(b'\n') + data.count(b'\r') - data.count(b'\r\n')
+    return endings + (1 if data and not data.endswith((b'\n', b'\r')) else 0)
 
-def analyze_file(file_path: str, root_dir: str) -> FileAnalysis:
+
+def _split_lines(source: str) -> List[str]:
+    """Split source into lines as readlines() would, without the line endings."""
+    source_lines = source.split('\n')
+    if source_lines[-1] == '':
+        source_lines.pop()
+    return source_lines
+
+
+def analyze_file(file_path: str, root_dir: str, max_bytes: int = MAX_BYTES) -> FileAnalysis:
     """Analyze a Python file and return detailed metrics."""
     full_path = os.path.join(root_dir, file_path) if not os.path.isabs(file_path) else file_path
-    lines = count_file_lines(full_path)
-    if lines == 0:
-        return FileAnalysis(
-            path=file_path,
-            lines=0,
-            classes=[],
-            functions=[],
-            imports=[],
-            method_counts={},
-            top_level_functions=0,
-            notes=["Could not read or decode file"]
-        )
+    try:
+        data = Path(full_path).read_bytes()
+    except IOError as e:
+        return _unparsed_analysis(file_path, 0, f"Could not read file: {e}")
+    
+    if b'\0' in data[:BINARY_SNIFF_BYTES]:
+        return _unparsed_analysis(file_path, 0, "Skipped AST parse: binary content")
+    
+    # Parse time grows with file size; huge (usually generated) files would
+    # dominate the run, so they only get a line count, taken on the raw bytes
+    if len(data) > max_bytes:
+        return _unparsed_analysis(
+            file_path, _count_lines(data),
+            f"Skipped AST parse: file too large ({len(data)} bytes)")
     
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            source = f.read()
-    except (UnicodeDecodeError, IOError) as e:
-        return FileAnalysis(
-            path=file_path,
-            lines=lines,
-            classes=[],
-            functions=[],
-            imports=[],
-            method_counts={},
-            top_level_functions=0,
-            notes=[f"Could not read file: {e}"]
-        )
+        source = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return _unparsed_analysis(file_path, 0, f"Could not read file: {e}")
+    if '\r' in source:
+        # Universal newlines, as text-mode reading would give
+        source = source.replace('\r\n', '\n').replace('\r', '\n')
     
-    source_lines = source.splitlines()
-    analyzer = ComplexityAnalyzer(file_path, source_lines)
+    return analyze_source(file_path, source)
+
+
+def analyze_source(file_path: str, source: str) -> FileAnalysis:
+    """Analyze Python source text; file_path is only used to label the result."""
+    source_lines = _split_lines(source)
     
     try:
         tree = ast.parse(source, filename=file_path)
-        analyzer.visit(tree)
     except SyntaxError as e:
-        return FileAnalysis(
-            path=file_path,
-            lines=lines,
-            classes=[],
-            functions=[],
-            imports=[],
-            method_counts={},
-            top_level_functions=0,
-            notes=[f"Syntax error: {e}"]
-        )
+        return _unparsed_analysis(file_path, len(source_lines), f"Syntax error: {e}")
     
-    # Calculate method counts per class
-    method_counts = {}
-    top_level_functions = 0
+    return _analyze_tree(file_path, tree, source_lines)
+
+
+def _analyze_tree(file_path: str, tree: ast.AST, source_lines: List[str]) -> FileAnalysis:
+    """Collect metrics from an already-parsed module."""
+    lines = len(source_lines)
+    analyzer = ComplexityAnalyzer(file_path, source_lines)
+    analyzer.visit(tree)
     
-    for func in analyzer.functions:
-        if func.is_method and func.class_name:
-            method_counts[func.class_name] = method_counts.get(func.class_name, 0) + 1
-        elif not func.is_method:
-            top_level_functions += 1
+    stats = _summarize_functions(analyzer.functions)
     
     # Generate notes for complexity concerns
     notes = []
@@ -197,31 +261,23 @@ def analyze_file(file_path: str, root_dir: str) -> FileAnalysis:
         notes.append(f"Many classes in file (classes={len(analyzer.classes)})")
     
     # Long functions
-    long_funcs = [f for f in analyzer.functions if f.lines > 50]
-    very_long_funcs = [f for f in analyzer.functions if f.lines > 100]
-    
-    if very_long_funcs:
-        notes.append(f"Very long functions: {len(very_long_funcs)} >100 lines")
-    elif long_funcs:
-        notes.append(f"Long functions: {len(long_funcs)} >50 lines")
+    if stats.very_long_count:
+        notes.append(f"Very long functions: {stats.very_long_count} >100 lines")
+    elif stats.long_count:
+        notes.append(f"Long functions: {stats.long_count} >50 lines")
     
     # High statement count
-    high_stmt_funcs = [f for f in analyzer.functions if f.statements > 20]
-    if high_stmt_funcs:
-        notes.append(f"Complex functions: {len(high_stmt_funcs)} >20 statements")
+    if stats.high_stmt_count:
+        notes.append(f"Complex functions: {stats.high_stmt_count} >20 statements")
     
     # Mixed concerns (both async and sync functions)
-    has_async = any(f.is_async for f in analyzer.functions)
-    has_sync = any(not f.is_async for f in analyzer.functions)
-    if has_async and has_sync and len(analyzer.functions) > 5:
+    if stats.has_async and stats.has_sync and len(analyzer.functions) > 5:
         notes.append("Mixed async/sync patterns")
     
     # Import patterns
-    web_imports = ['flask', 'django', 'fastapi', 'tornado', 'aiohttp', 'requests', 'httpx']
-    db_imports = ['sqlalchemy', 'psycopg2', 'pymongo', 'sqlite3', 'redis', 'asyncpg']
-    
-    has_web = any(any(imp.startswith(web) for web in web_imports) for imp in analyzer.imports)
-    has_db = any(any(imp.startswith(db) for db in db_imports) for imp in analyzer.imports)
+    top_modules = {imp.split('.', 1)[0] for imp in analyzer.imports}
+    has_web = not top_modules.isdisjoint(WEB_MODULES)
+    has_db = not top_modules.isdisjoint(DB_MODULES)
     
     if has_web and has_db:
         notes.append("Mixed web and database concerns")
@@ -232,49 +288,75 @@ def analyze_file(file_path: str, root_dir: str) -> FileAnalysis:
         classes=analyzer.classes,
         functions=analyzer.functions,
         imports=analyzer.imports,
-        method_counts=method_counts,
-        top_level_functions=top_level_functions,
-        notes=notes
+        method_counts=stats.method_counts,
+        top_level_functions=stats.top_level_functions,
+        notes=notes,
+        buckets=stats.buckets
     )
 
 
-def collect_python_files(root_dir: str, exclude_tests: bool = True) -> List[FileAnalysis]:
+def _analyze_wrapper(task: Tuple[str, str, int]) -> FileAnalysis:
+    """Unpack a (file_path, root_dir, max_bytes) task for ProcessPoolExecutor.map."""
+    file_path, root_dir, max_bytes = task
+    return analyze_file(file_path, root_dir, max_bytes)
+
+
+def _iter_python_files(dir_path: str, rel_dir: str, exclude_tests: bool) -> Iterator[str]:
+    """Yield paths, relative to the scan root, of Python files to analyze."""
+    try:
+        entries = os.scandir(dir_path)
+    except OSError:
+        return
+    
+    with entries:
+        for entry in entries:
+            file = entry.name
+            if entry.is_dir():
+                # Skip common non-source directories (and, like os.walk, symlinks)
+                if file not in SKIP_DIRS and not entry.is_symlink():
+                    sub_dir = f"{rel_dir}{file}{os.sep}"
+                    yield from _iter_python_files(entry.path, sub_dir, exclude_tests)
+                continue
+            
+            # Cheapest rejection first: most entries in a tree aren't Python
+            if not file.endswith('.py'):
+                continue
+            
+            # Skip __init__.py files (package structure files) and generated code
+            if file == '__init__.py' or file.endswith(GENERATED_SUFFIXES):
+                continue
+            
+            # Skip test files if exclude_tests is True
+            if exclude_tests and (file.startswith(TEST_PREFIXES) or file.endswith(TEST_SUFFIXES)):
+                continue
+            
+            yield rel_dir + file
+
+
+def collect_python_files(root_dir: str, exclude_tests: bool = True,
+                         max_bytes: int = MAX_BYTES) -> List[FileAnalysis]:
     """Collect and analyze all Python files in a directory."""
-    analyses = []
-    skip_dirs = {'.git', '__pycache__', '.pytest_cache', '.tox', 'venv', 'env', '.venv', 
-                'node_modules', 'build', 'dist', 'target', 'vendor'}
+    tasks = [(rel_path, root_dir, max_bytes)
+             for rel_path in _iter_python_files(root_dir, '', exclude_tests)]
     
-    for root, dirs, files in os.walk(root_dir):
-        # Skip common non-source directories
-        dirs[:] = [d for d in dirs if d not in skip_dirs]
-        
-        for file in files:
-            if file.endswith('.py') and not file.endswith('_pb2.py'):  # Skip protobuf generated files
-                # Skip __init__.py files (package structure files)
-                if file == '__init__.py':
-                    continue
-                    
-                # Skip test files if exclude_tests is True
-                if exclude_tests and (file.startswith('test_') or file.endswith('_test.py')):
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, root_dir)
-                analysis = analyze_file(rel_path, root_dir)
-                analyses.append(analysis)
-    
-    return analyses
-
-
-def print_analysis(analysis: FileAnalysis, top_functions: int = 5):
-    """Print analysis for a single file in a compact format."""
-    print(f"{analysis.lines:8d} {analysis.path}")
+    # Parsing is CPU-bound, so large trees are spread across processes;
+    # small ones aren't worth the worker start-up cost.
+    if len(tasks) < PARALLEL_THRESHOLD:
+        return [_analyze_wrapper(task) for task in tasks]
+    
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(_analyze_wrapper, tasks, chunksize=32))
+
+
+def build_analysis(analysis: FileAnalysis, top_functions: int = 5) -> List[str]:
+    """Format analysis for a single file in a compact format, one entry per line."""
+    out = [f"{analysis.lines:8d} {analysis.path}"]
     
     # Classes
     if analysis.classes:
-        print(f"    classes: {len(analysis.classes)} ({', '.join(analysis.classes[:3])}{'...' if len(analysis.classes) > 3 else ''})")
+        out.append(f"    classes: {len(analysis.classes)} ({', '.join(analysis.classes[:3])}{'...' if len(analysis.classes) > 3 else ''})")
     else:
-        print("    classes: 0")
+        out.append("    classes: 0")
     
     # Methods
     if analysis.method_counts or analysis.top_level_functions:
@@ -283,49 +365,29 @@ def print_analysis(analysis: FileAnalysis, top_functions: int = 5):
             method_parts.append(f"{class_name}={count}")
         if analysis.top_level_functions > 0:
             method_parts.append(f"top-level={analysis.top_level_functions}")
-        print(f"    methods: {'; '.join(method_parts)}")
+        out.append(f"    methods: {'; '.join(method_parts)}")
     else:
-        print("    methods: none")
+        out.append("    methods: none")
     
     # Line length buckets
-    buckets = _calculate_function_buckets(analysis.functions)
-    print(f"    buckets: >100={buckets['over100']}, 50-100={buckets['between50_100']}, 20-49={buckets['between20_49']}, <20={buckets['under20']}")
+    buckets = analysis.buckets
+    out.append(f"    buckets: >100={buckets['over100']}, 50-100={buckets['between50_100']}, 20-49={buckets['between20_49']}, <20={buckets['under20']}")
     
     # Top functions by lines
     if analysis.functions:
         sorted_funcs = sorted(analysis.functions, key=lambda f: f.lines, reverse=True)
         limit = min(top_functions, len(sorted_funcs))
-        print(f"    funcs (top {limit} by lines):")
+        out.append(f"    funcs (top {limit} by lines):")
         for i, func in enumerate(sorted_funcs[:limit]):
             async_prefix = "async " if func.is_async else ""
             method_prefix = f"{func.class_name}." if func.class_name else ""
-            print(f"      {func.lines:4d} lines | stmts={func.statements} | {async_prefix}{method_prefix}{func.name}")
+            out.append(f"      {func.lines:4d} lines | stmts={func.statements} | {async_prefix}{method_prefix}{func.name}")
     
     # Notes
     for note in analysis.notes:
-        print(f"    note: {note}")
-
-
-def _calculate_function_buckets(functions: List[FunctionInfo]) -> Dict[str, int]:
-    """Calculate function length buckets."""
-    buckets = {
-        'over100': 0,
-        'between50_100': 0,
-        'between20_49': 0,
-        'under20': 0
-    }
-    
-    for func in functions:
-        if func.lines > 100:
-            buckets['over100'] += 1
-        elif func.lines >= 50:
-            buckets['between50_100'] += 1
-        elif func.lines >= 20:
-            buckets['between20_49'] += 1
-        else:
-            buckets['under20'] += 1
+        out.append(f"    note: {note}")
     
-    return buckets
+    return out
 
 
 def main():
@@ -348,12 +410,14 @@ Examples:
                        help='Number of functions to list per file (default: 5)')
     parser.add_argument('--include-tests', action='store_true',
                        help='Include test files (test_*.py and *_test.py) in analysis')
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES,
+                       help=f'Skip parsing files larger than this many bytes (default: {MAX_BYTES})')
     
     args = parser.parse_args()
     
     try:
         exclude_tests = not args.include_tests
-        analyses = collect_python_files(args.dir, exclude_tests)
+        analyses = collect_python_files(args.dir, exclude_tests, args.max_bytes)
         
         if not analyses:
             print("No Python files found")
@@ -365,10 +429,9 @@ Examples:
         # Limit results
         limit = min(args.n, len(analyses))
         
-        for i in range(limit):
-            if i > 0:
-                print()  # Blank line between files
-            print_analysis(analyses[i], args.topfuncs)
+        # Emit the whole report in one write, with a blank line between files
+        report = "\n\n".join("\n".join(build_analysis(a, args.topfuncs)) for a in analyses[:limit])
+        sys.stdout.write(report + "\n")
         
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -1,55 +1,134 @@
 #!/usr/bin/env python3
 """Tests for py-file-analyzer."""
 
+import ast
 import os
 import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 
-# Add parent directory to path to import the analyzer
-import sys
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import (
+    PARALLEL_THRESHOLD,
+    analyze_file,
+    analyze_source,
+    collect_python_files,
+    _analyze_tree,
+    _iter_python_files,
+    _split_lines,
+    _summarize_functions,
+)
 
-from main import analyze_file, collect_python_files, _calculate_function_buckets
+SIMPLE_SOURCE = (
+    "def hello():\n    print('Hello')\n\n"
+    "class Test:\n    def method(self):\n        pass\n"
+)
+
+COMPLEX_SOURCE = (
+    "import os\nimport sys\n\n"
+    "async def long_function():\n"
+    + "".join(f"    print('Line {i}')\n" for i in range(60))
+    + "    return 'done'\n\n"
+    "class Complex:\n"
+    "    def method1(self):\n        pass\n"
+    "    def method2(self):\n        pass\n"
+)
+
+# Put fixtures on a memory-backed filesystem when one is available. This is
+# only a speed hint; tempfile's default location works the same.
+SHM_DIR = '/dev/shm'
+FIXTURE_ROOT = SHM_DIR if os.access(SHM_DIR, os.W_OK) else None
+
+
+class FakeDirEntry:
+    """Minimal os.DirEntry stand-in; children is None for files."""
+    
+    def __init__(self, parent: str, name: str, children=None):
+        self.name = name
+        self.path = f"{parent}/{name}"
+        self.children = children
+    
+    def is_dir(self):
+        return self.children is not None
+    
+    def is_symlink(self):
+        return False
+
+
+def fake_scandir(tree):
+    """Return an os.scandir replacement serving the nested dict `tree`.
+    
+    Directories are dicts, files are None; the root is scanned as "root".
+    """
+    dirs = {}
+    
+    def register(path, node):
+        entries = []
+        for name, child in node.items():
+            entry = FakeDirEntry(path, name, child)
+            entries.append(entry)
+            if child is not None:
+                register(entry.path, child)
+        dirs[path] = entries
+    
+    register("root", tree)
+    
+    class _Scandir:
+        def __init__(self, path):
+            self._entries = dirs[path]
+        
+        def __iter__(self):
+            return iter(self._entries)
+        
+        def __enter__(self):
+            return self
+        
+        def __exit__(self, *exc_info):
+            return False
+    
+    return _Scandir
 
 
 class TestPyFileAnalyzer(unittest.TestCase):
-    def setUp(self):
-        """Create a temporary directory with test Python files."""
-        self.test_dir = tempfile.mkdtemp()
-        
-        # Simple test file
-        simple_file = os.path.join(self.test_dir, "simple.py")
-        with open(simple_file, 'w') as f:
-            f.write("def hello():\n    print('Hello')\n\n")
-            f.write("class Test:\n    def method(self):\n        pass\n")
-        
-        # Complex test file
-        complex_file = os.path.join(self.test_dir, "complex.py")
-        with open(complex_file, 'w') as f:
-            f.write("import os\nimport sys\n\n")
-            f.write("async def long_function():\n")
-            for i in range(60):
-                f.write(f"    print('Line {i}')\n")
-            f.write("    return 'done'\n\n")
-            f.write("class Complex:\n")
-            f.write("    def method1(self):\n        pass\n")
-            f.write("    def method2(self):\n        pass\n")
-            
+    @classmethod
+    def setUpClass(cls):
+        """Create a temporary directory with test Python files, shared by all tests.
+        
+        Only the file-collection tests need it; source analysis is tested on
+        the strings above directly.
+        """
+        cls._tmp = tempfile.TemporaryDirectory(dir=FIXTURE_ROOT)
+        cls.test_dir = cls._tmp.name
+        
+        Path(cls.test_dir, "simple.py").write_text(SIMPLE_SOURCE)
+        Path(cls.test_dir, "complex.py").write_text(COMPLEX_SOURCE)
+        
         # __init__.py file (should be excluded)
-        init_file = os.path.join(self.test_dir, "__init__.py")
-        with open(init_file, 'w') as f:
-            f.write("# Package initialization file\n")
+        Path(cls.test_dir, "__init__.py").write_text("# Package initialization file\n")
+        
+        # Test file (only included when exclude_tests=False)
+        Path(cls.test_dir, "test_example.py").write_text(
+            "import unittest\n\n"
+            "class TestExample(unittest.TestCase):\n"
+            "    def test_something(self):\n        self.assertTrue(True)\n")
+        
+        # Fixtures never change, so each is parsed and analyzed once; tests
+        # only read these
+        cls.simple_tree = ast.parse(SIMPLE_SOURCE)
+        cls.complex_tree = ast.parse(COMPLEX_SOURCE)
+        cls.simple_analysis = _analyze_tree(
+            "simple.py", cls.simple_tree, _split_lines(SIMPLE_SOURCE))
+        cls.complex_analysis = _analyze_tree(
+            "complex.py", cls.complex_tree, _split_lines(COMPLEX_SOURCE))
     
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up test files."""
-        import shutil
-        shutil.rmtree(self.test_dir)
+        cls._tmp.cleanup()
     
     def test_simple_file_analysis(self):
         """Test analysis of a simple Python file."""
-        simple_file = os.path.join(self.test_dir, "simple.py")
-        analysis = analyze_file("simple.py", self.test_dir)
+        analysis = self.simple_analysis
         
         self.assertEqual(analysis.path, "simple.py")
         self.assertGreater(analysis.lines, 0)
@@ -60,8 +139,7 @@ class TestPyFileAnalyzer(unittest.TestCase):
     
     def test_complex_file_analysis(self):
         """Test analysis of a more complex Python file."""
-        complex_file = os.path.join(self.test_dir, "complex.py")
-        analysis = analyze_file("complex.py", self.test_dir)
+        analysis = self.complex_analysis
         
         self.assertEqual(analysis.path, "complex.py")
         self.assertGreater(analysis.lines, 60)
@@ -74,23 +152,48 @@ class TestPyFileAnalyzer(unittest.TestCase):
         self.assertTrue(long_func.is_async)
         self.assertGreater(long_func.lines, 50)
     
-    def test_calculate_function_buckets(self):
-        """Test function bucket calculation."""
-        from main import FunctionInfo
+    def test_analyze_source(self):
+        """Test the public source-string entry point, including syntax errors."""
+        analysis = analyze_source("simple.py", SIMPLE_SOURCE)
         
-        functions = [
-            FunctionInfo("func1", 10, 5, False, False),
-            FunctionInfo("func2", 30, 15, False, False),
-            FunctionInfo("func3", 75, 25, False, False),
-            FunctionInfo("func4", 120, 40, False, False),
-        ]
+        self.assertEqual(analysis, self.simple_analysis)
         
-        buckets = _calculate_function_buckets(functions)
+        broken = analyze_source("broken.py", "def broken(:\n    pass\n")
+        self.assertEqual(broken.lines, 2)
+        self.assertEqual(broken.functions, [])
+        self.assertTrue(broken.notes[0].startswith("Syntax error:"))
+    
+    def test_large_file_skips_parse(self):
+        """Test that files over max_bytes are line-counted but not parsed."""
+        analysis = analyze_file("complex.py", self.test_dir, max_bytes=100)
+        
+        self.assertGreater(analysis.lines, 60)
+        self.assertEqual(analysis.functions, [])
+        self.assertTrue(analysis.notes[0].startswith("Skipped AST parse: file too large"))
+    
+    def test_summarize_functions(self):
+        """Test function stats and buckets, including on large function lists."""
+        from main import FunctionInfo
         
-        self.assertEqual(buckets['under20'], 1)  # func1
-        self.assertEqual(buckets['between20_49'], 1)  # func2
-        self.assertEqual(buckets['between50_100'], 1)  # func3
-        self.assertEqual(buckets['over100'], 1)  # func4
+        for n in (1, 2500):
+            with self.subTest(N=n):
+                # func1 <20, func2 20-49, func3 50-100, func4 >100 lines, n times each
+                functions = [
+                    FunctionInfo(f"func{i}", lines, lines // 3, False, False)
+                    for i, lines in enumerate([10, 30, 75, 120] * n)
+                ]
+                
+                stats = _summarize_functions(functions)
+                buckets = stats.buckets
+                
+                self.assertEqual(buckets['under20'], n)
+                self.assertEqual(buckets['between20_49'], n)
+                self.assertEqual(buckets['between50_100'], n)
+                self.assertEqual(buckets['over100'], n)
+                self.assertEqual(stats.long_count, 2 * n)  # 75 and 120 lines
+                self.assertEqual(stats.very_long_count, n)  # 120 lines
+                self.assertEqual(stats.high_stmt_count, 2 * n)  # 25 and 40 statements
+                self.assertEqual(stats.top_level_functions, 4 * n)
     
     def test_collect_python_files(self):
         """Test collecting Python files from a directory."""
@@ -105,23 +208,57 @@ class TestPyFileAnalyzer(unittest.TestCase):
         self.assertIn("simple.py", paths)
         self.assertIn("complex.py", paths)
         self.assertNotIn("__init__.py", paths)  # Should be excluded
-        
-        # Test with exclude_tests=False
-        # Create a test file in the test directory
-        test_file = os.path.join(self.test_dir, "test_example.py")
-        with open(test_file, 'w') as f:
-            f.write("import unittest\n\nclass TestExample(unittest.TestCase):\n    def test_something(self):\n        self.assertTrue(True)\n")
-        
-        # Should still exclude test files when exclude_tests=True
-        analyses_no_tests = collect_python_files(self.test_dir, exclude_tests=True)
-        self.assertEqual(len(analyses_no_tests), 2)  # Still 2, test file excluded
+        self.assertNotIn("test_example.py", paths)  # Test file excluded
         
         # Should include test files when exclude_tests=False
         analyses_with_tests = collect_python_files(self.test_dir, exclude_tests=False)
         self.assertEqual(len(analyses_with_tests), 3)  # Now 3, test file included
         # But __init__.py should still be excluded
         paths_with_tests = [a.path for a in analyses_with_tests]
+        self.assertIn("test_example.py", paths_with_tests)
         self.assertNotIn("__init__.py", paths_with_tests)
+    
+    def test_python_file_filter(self):
+        """Test directory pruning and filename exclusion on a synthetic tree."""
+        tree = {
+            "mod.py": None,
+            "__init__.py": None,
+            "api_pb2.py": None,
+            "test_mod.py": None,
+            "mod_test.py": None,
+            "README.md": None,
+            "pkg": {"inner.py": None},
+            "venv": {"site.py": None},
+            "__pycache__": {"cached.py": None},
+        }
+        inner = os.path.join("pkg", "inner.py")
+        
+        with patch("main.os.scandir", fake_scandir(tree)):
+            without_tests = list(_iter_python_files("root", "", exclude_tests=True))
+            with_tests = list(_iter_python_files("root", "", exclude_tests=False))
+        
+        self.assertEqual(without_tests, ["mod.py", inner])
+        self.assertEqual(with_tests, ["mod.py", "test_mod.py", "mod_test.py", inner])
+    
+    def test_collect_python_files_parallel(self):
+        """Test that large trees analyzed in worker processes are fully analyzed."""
+        # Writes its own tree so the shared fixture directory stays unchanged
+        tmp = tempfile.TemporaryDirectory(dir=FIXTURE_ROOT)
+        self.addCleanup(tmp.cleanup)
+        tree_dir = tmp.name
+        pkg_dir = os.path.join(tree_dir, "pkg")
+        os.mkdir(pkg_dir)
+        for i in range(PARALLEL_THRESHOLD):
+            Path(pkg_dir, f"mod{i}.py").write_text(f"def func{i}():\n    return {i}\n")
+        
+        analyses = collect_python_files(tree_dir, exclude_tests=True)
+        
+        self.assertEqual(len(analyses), PARALLEL_THRESHOLD)
+        by_path = {a.path: a for a in analyses}
+        module = by_path[os.path.join("pkg", "mod7.py")]
+        self.assertEqual(module.lines, 2)
+        self.assertEqual([f.name for f in module.functions], ["func7"])
+        self.assertEqual(module.top_level_functions, 1)
 
 
 if __name__ == '__main__':